@@ -1,3 +1,3 @@
-from .oauth import oauth_settings
+from .oauth import OAuthSettings, get_oauth_settings
 
-__all__ = ["oauth_settings"]
\ No newline at end of file
+__all__ = ["OAuthSettings", "get_oauth_settings"]
\ No newline at end of file
@@ -1,10 +1,10 @@
+from functools import lru_cache
+
 from dotenv import load_dotenv
 from fastapi import HTTPException
 from pydantic_settings import BaseSettings
 from client.logger import logger
 
-load_dotenv()
-
 
 class OAuthSettings(BaseSettings):
     AZURE_CLIENT_ID: str
@@ -19,6 +19,9 @@ class OAuthSettings(BaseSettings):
 
 def initialize_oauth_settings():
     try:
+        # Load variables from a plain .env file (if any) before the settings are parsed
+        load_dotenv()
+
         # Create an instance of OAuthSettings
         settings = OAuthSettings()
 
@@ -41,5 +44,10 @@ def initialize_oauth_settings():
                             detail="Configuration error: An error occurred while loading OAuth settings.")
 
 
-# Initialize OAuth settings
-oauth_settings = initialize_oauth_settings()
+@lru_cache(maxsize=1)
+def get_oauth_settings() -> OAuthSettings:
+    """
+    Returns the OAuth settings, parsing the environment on first use only.
+    Nothing is read from disk while the module is being imported.
+    """
+    return initialize_oauth_settings()
@@ -1,14 +1,75 @@
 # client/main.py
 
+import asyncio
+import os
+import signal
+import tempfile
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
+from client.config import get_oauth_settings
+from client.logger import logger
+from client.profiling import ProfilingMiddleware, RequestProfiler
 from client.routers import auth, heroes
+from client.services.backend_client import backend_client
+
+profiler = RequestProfiler(os.getenv("HVALFANGST_PROFILE_DIR", os.path.join(tempfile.gettempdir(), "hvalfangst-profiles")))
+
+
+def toggle_profiling():
+    """Signal handler which starts a profiling session, or stops and dumps the active one."""
+    if profiler.session is not None:
+        profiler.stop()
+        return
+    profiler.start(
+        os.getenv("HVALFANGST_PROFILE_MODE", "cprofile"),
+        int(os.getenv("HVALFANGST_PROFILE_REQUESTS", "100")),
+        float(os.getenv("HVALFANGST_PROFILE_SECONDS", "60"))
+    )
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Load the OAuth settings once the server starts rather than when the module is imported
+    settings = get_oauth_settings()
+
+    # Opening a browser only makes sense for a single local worker; set to "0" for headless or multi-worker runs
+    if os.getenv("HVALFANGST_CLIENT_OPEN_BROWSER", "1") == "1":
+        import webbrowser
+        from client.services.auth_service import build_login_url
+
+        logger.info("Opening login URL in the default web browser")
+        webbrowser.open_new_tab(build_login_url(settings))
+    else:
+        logger.info("Browser launch disabled, navigate to /auth/login to sign in")
+
+    # Send SIGUSR1 to the process (kill -USR1 <pid>) to toggle profiling of the next requests
+    try:
+        asyncio.get_running_loop().add_signal_handler(signal.SIGUSR1, toggle_profiling)
+    except (AttributeError, NotImplementedError, RuntimeError):
+        logger.info("Signal handlers are not available, profiling via SIGUSR1 is disabled")
+
+    # Keep a local copy of the heroes up to date from the server's change feed
+    if os.getenv("HVALFANGST_CLIENT_HERO_MIRROR", "1") == "1":
+        heroes.hero_mirror.start()
+
+    yield
+
+    await heroes.hero_mirror.stop()
+
+    # Release the pooled connections to the backend
+    await backend_client.aclose()
+
 
 app = FastAPI(
     title="Hvalfangst Client",
     description="Client accessing our server deployed on Azure Web Apps secured by OAuth 2.0 authorization code flow with OIDC",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
+app.add_middleware(ProfilingMiddleware, profiler=profiler, trace_header=os.getenv("HVALFANGST_TRACE_HEADER", "X-Hvalfangst-Trace"))
+
 # Register the oauth and heroes router
 app.include_router(auth.router, prefix="/auth", tags=["OAuth2 Back-channel"])
 app.include_router(heroes.router, prefix="/api", tags=["Heroes"])
@@ -0,0 +1,4 @@
+from .middleware import ProfilingMiddleware
+from .profiler import RequestProfiler, RequestTrace, mark_authenticated, request_trace, stage
+
+__all__ = ["ProfilingMiddleware", "RequestProfiler", "RequestTrace", "mark_authenticated", "request_trace", "stage"]
\ No newline at end of file
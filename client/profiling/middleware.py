@@ -0,0 +1,58 @@
+import time
+
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from client.logger import logger
+from client.profiling.profiler import RequestProfiler, RequestTrace, request_trace
+
+
+class ProfilingMiddleware:
+    """
+    Counts requests towards an active profiling session and reports per-stage timings in a 'Server-Timing'
+    response header for requests carrying the trace header. Requests are passed straight through otherwise.
+    """
+
+    def __init__(self, app: ASGIApp, profiler: RequestProfiler, trace_header: str = "X-Hvalfangst-Trace"):
+        self.app = app
+        self.profiler = profiler
+        self.trace_header = trace_header.lower().encode("latin-1") if trace_header else None
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        profiling = self.profiler.session is not None
+        traced = self.trace_header is not None and any(name == self.trace_header for name, _ in scope["headers"])
+        if not profiling and not traced:
+            await self.app(scope, receive, send)
+            return
+
+        try:
+            if traced:
+                await self._traced(scope, receive, send)
+            else:
+                await self.app(scope, receive, send)
+        finally:
+            if profiling:
+                self.profiler.request_finished()
+
+    async def _traced(self, scope: Scope, receive: Receive, send: Send) -> None:
+        trace = RequestTrace()
+        timings = trace.timings
+        token = request_trace.set(trace)
+        started = time.perf_counter()
+
+        async def send_with_timings(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                timings["total"] = (time.perf_counter() - started) * 1000
+                MutableHeaders(scope=message).append(
+                    "Server-Timing", ", ".join(f"{name};dur={ms:.2f}" for name, ms in timings.items())
+                )
+                logger.info(f"Trace {scope['method']} {scope['path']}: {timings}")
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timings)
+        finally:
+            request_trace.reset(token)
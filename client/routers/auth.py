@@ -1,11 +1,20 @@
 from http.client import HTTPException
 from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import RedirectResponse
+from client.config import get_oauth_settings
 from client.logger import logger
-from client.services.auth_service import handle_openid_connect_flow
+from client.services.auth_service import build_login_url, handle_openid_connect_flow
 
 router = APIRouter()
 
 
+@router.get("/login")
+async def login():
+    """Redirects the user agent to the Entra ID authorization endpoint."""
+    logger.info("Received login request on /auth/login")
+    return RedirectResponse(build_login_url(get_oauth_settings()))
+
+
 @router.get("/callback")
 async def auth_callback(request: Request):
     """Callback handler for OpenID Connect flow."""
@@ -2,22 +2,21 @@ import os
 from http.client import HTTPException
 from typing import List
 
-import httpx
 from fastapi import APIRouter, HTTPException
 
 from client.logger import logger
 from client.models import Hero
+from client.profiling import stage
+from client.services.backend_client import backend_client
+from client.services.hero_mirror import HeroMirror
 from client.services.token_storage import get_stored_token  # Import get_stored_token function
 
 router = APIRouter()
 
-# Set values based on environment variable or hard-coded URL
-BACKEND_API_BASE_URL = os.getenv("HVALFANGST_API_URL", "https://hvalfangstlinuxwebapp.azurewebsites.net/api")
-
 
 # Helper function to make HTTP requests to the backend API
-async def request_backend(method: str, endpoint: str, json=None):
-    url = f"{BACKEND_API_BASE_URL}{endpoint}"
+async def request_backend(method: str, endpoint: str, json=None, long_poll: bool = False):
+    url = f"{backend_client.base_url}{endpoint}"
 
     # Retrieve the access token from token storage
     token_data = get_stored_token()
@@ -28,24 +27,41 @@ async def request_backend(method: str, endpoint: str, json=None):
     logger.info(f"Headers: {headers}")
     logger.info(f"Payload: {json}")
 
+    # Timeouts, retries, hedging and the circuit breaker are handled by the backend client
+    with stage("backend"):
+        response = await backend_client.request(method, endpoint, json=json, headers=headers, long_poll=long_poll)
+
+    if response.is_error:
+        logger.error(f"HTTP error occurred for {method} request to {url}: {response.status_code} - {response.text}")
+        # Pass 'Retry-After' on so that callers know when to try again after a 429 or 503
+        retry_after = response.headers.get("Retry-After")
+        raise HTTPException(status_code=response.status_code, detail=response.text,
+                            headers={"Retry-After": retry_after} if retry_after else None)
+
+    logger.info(f"Request to {url} completed successfully with status code {response.status_code}")
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.request(method, url, json=json, headers=headers)
-            response.raise_for_status()
-            logger.info(f"Request to {url} completed successfully with status code {response.status_code}")
-            return response.json()
-    except httpx.HTTPStatusError as e:
-        logger.error(f"HTTP error occurred for {method} request to {url}: {e.response.status_code} - {e.response.text}")
-        raise HTTPException(status_code=e.response.status_code, detail=e.response.text)
-    except Exception as e:
+        return response.json()
+    except ValueError as e:
         logger.error(f"An unexpected error occurred: {e}")
-        raise HTTPException(status_code=500, detail="An unexpected error occurred")
+        raise HTTPException(status_code=502, detail="Invalid response from backend")
+
+
+# Local copy of the heroes kept up to date from the server's change feed, started in the application lifespan
+hero_mirror = HeroMirror(request_backend, float(os.getenv("HVALFANGST_CLIENT_MIRROR_POLL_SECONDS", "8")))
+
+
+# GET: Resilience state of the backend client (circuit breaker, retries, hedging, latency)
+@router.get("/backend/status", response_model=dict)
+async def backend_status():
+    return backend_client.status()
 
 
 # POST: Create a new Hero
 @router.post("/heroes/", response_model=Hero)
 async def create_hero(hero: Hero):
-    return await request_backend("POST", "/heroes/", json=hero.dict())
+    created = await request_backend("POST", "/heroes/", json=hero.dict())
+    hero_mirror.apply_created(created)
+    return created
 
 
 # GET: Retrieve a hero by ID
@@ -57,10 +73,14 @@ async def read_hero(hero_id: str):
 # GET: Retrieve all heroes
 @router.get("/heroes/", response_model=List[Hero])
 async def read_heroes():
+    if hero_mirror.synced:
+        return hero_mirror.list_heroes()
     return await request_backend("GET", "/heroes/")
 
 
 # DELETE: Delete a hero by ID
 @router.delete("/heroes/{hero_id}", response_model=dict)
 async def delete_hero(hero_id: str):
-    return await request_backend("DELETE", f"/heroes/{hero_id}")
+    result = await request_backend("DELETE", f"/heroes/{hero_id}")
+    hero_mirror.apply_deleted(hero_id)
+    return result
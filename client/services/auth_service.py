@@ -1,38 +1,37 @@
-import webbrowser
 from typing import List
 from urllib.parse import urlencode
 import httpx
 import jwt
 from fastapi import HTTPException
-from fastapi.security import OAuth2AuthorizationCodeBearer
-from client.config import oauth_settings
+from client.config import OAuthSettings, get_oauth_settings
 from client.logger import logger
+from client.profiling import stage
 from client.services.token_storage import store_token
 
-AUTHORITY = f"https://login.microsoftonline.com/{oauth_settings.AZURE_TENANT_ID}"
-AUTH_URL = f"{AUTHORITY}/oauth2/v2.0/authorize"
-TOKEN_URL = f"{AUTHORITY}/oauth2/v2.0/token"
-JWKS_URL = f"https://login.microsoftonline.com/{oauth_settings.AZURE_TENANT_ID}/discovery/v2.0/keys"
 
-# OAuth2AuthorizationCodeBearer scheme
-oauth2_scheme = OAuth2AuthorizationCodeBearer(
-    authorizationUrl=AUTH_URL,
-    tokenUrl=TOKEN_URL
-)
+def get_authority(settings: OAuthSettings) -> str:
+    """Returns the Entra ID authority of the configured tenant."""
+    return f"https://login.microsoftonline.com/{settings.AZURE_TENANT_ID}"
 
-# Prepare the parameters for the OAuth2 authorization URL
-query_params = {
-    "client_id": oauth_settings.AZURE_CLIENT_ID,
-    "response_type": "code",
-    "scope": oauth_settings.SCOPES,
-    "response_mode": "query"
-}
 
-# Encode the query parameters and construct the full authorization URL
-login_url = f"https://login.microsoftonline.com/{oauth_settings.AZURE_TENANT_ID}/oauth2/v2.0/authorize?{urlencode(query_params)} "
+def get_token_url(settings: OAuthSettings) -> str:
+    """Returns the token endpoint used to redeem authorization codes."""
+    return f"{get_authority(settings)}/oauth2/v2.0/token"
 
-# Open the login URL in the default web browser
-webbrowser.open_new_tab(login_url)
+
+def build_login_url(settings: OAuthSettings) -> str:
+    """Builds the authorization URL which starts the OpenID Connect flow."""
+
+    # Prepare the parameters for the OAuth2 authorization URL
+    query_params = {
+        "client_id": settings.AZURE_CLIENT_ID,
+        "response_type": "code",
+        "scope": settings.SCOPES,
+        "response_mode": "query"
+    }
+
+    # Encode the query parameters and construct the full authorization URL
+    return f"{get_authority(settings)}/oauth2/v2.0/authorize?{urlencode(query_params)}"
 
 
 async def handle_openid_connect_flow(code: str):
@@ -45,7 +44,8 @@ async def handle_openid_connect_flow(code: str):
         logger.info("Attempting to request access token")
 
         # Exchange code for token
-        token = await get_access_token(code)
+        with stage("token_exchange"):
+            token = await get_access_token(code)
 
         # Attempt to fetch id and access token from the results
         logger.info("Attempting to fetch id_token from token")
@@ -57,8 +57,9 @@ async def handle_openid_connect_flow(code: str):
             raise HTTPException(status_code=400, detail="ID token not found in response")
 
         # Decode id and access tokens - signature verification will be done on the server
-        decoded_id_token = jwt.decode(id_token, options={"verify_signature": False}, algorithms=["RS256"])
-        decoded_access_token = jwt.decode(access_token, options={"verify_signature": False}, algorithms=["RS256"])
+        with stage("token_decode"):
+            decoded_id_token = jwt.decode(id_token, options={"verify_signature": False}, algorithms=["RS256"])
+            decoded_access_token = jwt.decode(access_token, options={"verify_signature": False}, algorithms=["RS256"])
         print("Decoded ID Token:", decoded_id_token)
         print("Decoded access Token:", decoded_access_token)
 
@@ -77,11 +78,12 @@ async def get_access_token(code: str):
     """Exchange authorization code for an access token."""
 
     logger.info("Starting authorization code exchange for access token")
+    oauth_settings = get_oauth_settings()
 
     async with httpx.AsyncClient() as client:
         try:
             response = await client.post(
-                TOKEN_URL,
+                get_token_url(oauth_settings),
                 data={
                     'client_id': oauth_settings.AZURE_CLIENT_ID,
                     'client_secret': oauth_settings.AZURE_CLIENT_SECRET,
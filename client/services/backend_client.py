@@ -0,0 +1,268 @@
+import asyncio
+import os
+import random
+import time
+from collections import deque
+from typing import Optional
+
+import httpx
+from fastapi import HTTPException
+from client.logger import logger
+
+# Methods which may safely be sent more than once (RFC 9110, section 9.2.2)
+IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS", "PUT", "DELETE"}
+
+# Backend responses which indicate a transient failure worth retrying
+RETRYABLE_STATUS_CODES = {502, 503, 504}
+
+
+def parse_retry_after(response: httpx.Response) -> Optional[float]:
+    """Returns the delay in seconds of the 'Retry-After' header, or None if absent or given as an HTTP date."""
+    value = response.headers.get("Retry-After", "")
+    return float(value) if value.strip().isdigit() else None
+
+
+class CircuitBreaker:
+    """
+    Fails fast while the backend is unhealthy. Opens after `failure_threshold` consecutive failures,
+    lets a single trial request through once `reset_timeout` seconds have passed (half-open) and
+    closes again as soon as that request succeeds. A trial which has not reported back within
+    `reset_timeout` is given up on, so that another one may be let through.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self.consecutive_failures = 0
+        self.opened_at: Optional[float] = None
+        self.trial_in_flight = False
+        self.trial_started_at: Optional[float] = None
+
+    def allow_request(self) -> bool:
+        if self.state == "closed":
+            return True
+        if self.state == "open" and time.monotonic() - self.opened_at >= self.reset_timeout:
+            logger.info("Circuit breaker half-open, letting a trial request through")
+            self.state = "half-open"
+        if self.state == "half-open":
+            now = time.monotonic()
+            if self.trial_in_flight and now - self.trial_started_at >= self.reset_timeout:
+                logger.warning("Circuit breaker trial request did not complete in time, letting another one through")
+                self.trial_in_flight = False
+            if not self.trial_in_flight:
+                self.trial_in_flight = True
+                self.trial_started_at = now
+                return True
+        return False
+
+    def release_trial(self) -> None:
+        """Lets another trial request through if the current one ended without telling anything about the backend."""
+        self.trial_in_flight = False
+
+    def record_success(self) -> None:
+        if self.state != "closed":
+            logger.info("Circuit breaker closed, backend has recovered")
+        self.state = "closed"
+        self.consecutive_failures = 0
+        self.opened_at = None
+        self.trial_in_flight = False
+
+    def record_failure(self) -> None:
+        self.consecutive_failures += 1
+        self.trial_in_flight = False
+        if self.state == "half-open" or self.consecutive_failures >= self.failure_threshold:
+            if self.state != "open":
+                logger.warning(f"Circuit breaker opened after {self.consecutive_failures} consecutive failures")
+            self.state = "open"
+            self.opened_at = time.monotonic()
+
+    def retry_after(self) -> int:
+        if self.opened_at is None:
+            return 1
+        return max(1, int(self.reset_timeout - (time.monotonic() - self.opened_at)) + 1)
+
+    def status(self) -> dict:
+        return {
+            "state": self.state,
+            "consecutive_failures": self.consecutive_failures,
+            "retry_after_seconds": self.retry_after() if self.state == "open" else 0,
+        }
+
+
+class LatencyTracker:
+    """Keeps a rolling window of recent request latencies (in seconds) to derive percentiles from."""
+
+    def __init__(self, window: int = 200, min_samples: int = 20):
+        self.samples = deque(maxlen=window)
+        self.min_samples = min_samples
+
+    def record(self, latency: float) -> None:
+        self.samples.append(latency)
+
+    def percentile(self, p: float) -> Optional[float]:
+        if len(self.samples) < self.min_samples:
+            return None
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))]
+
+
+class ResilientBackendClient:
+    """
+    HTTP client for the resource server with per-phase timeouts, retries of idempotent requests with
+    exponential backoff and full jitter, optional hedged GETs and a circuit breaker.
+    """
+
+    def __init__(self):
+        self.base_url = os.getenv("HVALFANGST_API_URL", "https://hvalfangstlinuxwebapp.azurewebsites.net/api")
+        self.timeout = httpx.Timeout(
+            connect=float(os.getenv("HVALFANGST_API_CONNECT_TIMEOUT", "3.05")),
+            read=float(os.getenv("HVALFANGST_API_READ_TIMEOUT", "10")),
+            write=float(os.getenv("HVALFANGST_API_WRITE_TIMEOUT", "10")),
+            pool=float(os.getenv("HVALFANGST_API_POOL_TIMEOUT", "2")),
+        )
+        self.max_retries = int(os.getenv("HVALFANGST_API_MAX_RETRIES", "2"))
+        self.backoff_base = float(os.getenv("HVALFANGST_API_BACKOFF_BASE", "0.1"))
+        self.backoff_cap = float(os.getenv("HVALFANGST_API_BACKOFF_CAP", "2"))
+        self.hedge_enabled = os.getenv("HVALFANGST_API_HEDGE_GETS", "0") == "1"
+        self.hedge_percentile = float(os.getenv("HVALFANGST_API_HEDGE_PERCENTILE", "95"))
+        self.breaker = CircuitBreaker(
+            failure_threshold=int(os.getenv("HVALFANGST_API_BREAKER_THRESHOLD", "5")),
+            reset_timeout=float(os.getenv("HVALFANGST_API_BREAKER_RESET_TIMEOUT", "30")),
+        )
+        self.latency = LatencyTracker()
+        self.counters = {"requests": 0, "retries": 0, "hedges_sent": 0, "hedges_won": 0, "rejected_by_breaker": 0}
+        self._client: Optional[httpx.AsyncClient] = None
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        # Created on first use so that importing the module stays free of side effects
+        if self._client is None:
+            self._client = httpx.AsyncClient(timeout=self.timeout)
+        return self._client
+
+    async def aclose(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def backoff(self, attempt: int) -> float:
+        return random.uniform(0, min(self.backoff_cap, self.backoff_base * 2 ** attempt))
+
+    async def _send(self, method: str, url: str, record_latency: bool = True, **kwargs) -> httpx.Response:
+        started = time.monotonic()
+        response = await self.client.request(method, url, **kwargs)
+        if record_latency and response.status_code < 500:
+            self.latency.record(time.monotonic() - started)
+        return response
+
+    async def _send_hedged(self, method: str, url: str, **kwargs) -> httpx.Response:
+        """Sends a second copy of a GET if the first has not completed within the latency percentile threshold."""
+        threshold = self.latency.percentile(self.hedge_percentile)
+        if threshold is None:
+            return await self._send(method, url, **kwargs)
+
+        primary = asyncio.create_task(self._send(method, url, **kwargs))
+        done, _ = await asyncio.wait({primary}, timeout=threshold)
+        if done:
+            return primary.result()
+
+        logger.info(f"No response from {url} within {threshold:.3f}s, sending hedged request")
+        self.counters["hedges_sent"] += 1
+        hedge = asyncio.create_task(self._send(method, url, **kwargs))
+        pending = {primary, hedge}
+        try:
+            while True:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None or not pending:
+                        if task is hedge and task.exception() is None:
+                            self.counters["hedges_won"] += 1
+                        return task.result()
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def request(self, method: str, endpoint: str, json=None, headers=None, long_poll: bool = False):
+        """
+        Sends a request to the backend. Long-polls (`long_poll`) are expected to be slow, so they are neither
+        hedged nor recorded in the latency percentiles which decide when other requests are hedged.
+        """
+        url = f"{self.base_url}{endpoint}"
+        method = method.upper()
+        retries = self.max_retries if method in IDEMPOTENT_METHODS else 0
+        self.counters["requests"] += 1
+
+        attempt = 0
+        while True:
+            if not self.breaker.allow_request():
+                self.counters["rejected_by_breaker"] += 1
+                logger.warning(f"Circuit breaker open, failing fast for {method} request to {url}")
+                raise HTTPException(
+                    status_code=503,
+                    detail="Backend temporarily unavailable",
+                    headers={"Retry-After": str(self.breaker.retry_after())},
+                )
+
+            try:
+                if self.hedge_enabled and method == "GET" and not long_poll:
+                    response = await self._send_hedged(method, url, json=json, headers=headers)
+                else:
+                    response = await self._send(method, url, record_latency=not long_poll, json=json, headers=headers)
+            except httpx.TransportError as e:
+                self.breaker.record_failure()
+                if attempt < retries:
+                    attempt = await self._before_retry(attempt, method, url, repr(e))
+                    continue
+                logger.error(f"{method} request to {url} failed: {e!r}")
+                if isinstance(e, httpx.TimeoutException):
+                    raise HTTPException(status_code=504, detail="Backend request timed out")
+                raise HTTPException(status_code=502, detail="Backend unreachable")
+            except asyncio.CancelledError:
+                # A cancelled request (e.g. the caller disconnected) says nothing about the backend
+                self.breaker.release_trial()
+                raise
+            except Exception:
+                self.breaker.record_failure()
+                raise
+
+            retry_after = parse_retry_after(response)
+            if response.status_code == 503 and retry_after is not None:
+                # The backend is up but shedding load, which is no reason to open the breaker
+                self.breaker.release_trial()
+                if attempt < retries and retry_after <= self.backoff_cap:
+                    attempt = await self._before_retry(attempt, method, url, "503, shedding load", retry_after)
+                    continue
+            elif response.status_code >= 500:
+                self.breaker.record_failure()
+                if response.status_code in RETRYABLE_STATUS_CODES and attempt < retries:
+                    attempt = await self._before_retry(attempt, method, url, str(response.status_code), retry_after)
+                    continue
+            else:
+                self.breaker.record_success()
+            return response
+
+    async def _before_retry(self, attempt: int, method: str, url: str, reason: str,
+                            retry_after: Optional[float] = None) -> int:
+        # Never retry sooner than the backend asked us to, nor later than the backoff cap
+        delay = min(self.backoff_cap, max(self.backoff(attempt), retry_after or 0))
+        self.counters["retries"] += 1
+        logger.warning(f"{method} request to {url} failed ({reason}), retrying in {delay:.3f}s")
+        await asyncio.sleep(delay)
+        return attempt + 1
+
+    def status(self) -> dict:
+        p50 = self.latency.percentile(50)
+        p_hedge = self.latency.percentile(self.hedge_percentile)
+        return {
+            "circuit_breaker": self.breaker.status(),
+            "counters": dict(self.counters),
+            "latency_seconds": {"p50": p50, f"p{self.hedge_percentile:g}": p_hedge, "samples": len(self.latency.samples)},
+            "hedging_enabled": self.hedge_enabled,
+            "max_retries": self.max_retries,
+            "timeouts": {"connect": self.timeout.connect, "read": self.timeout.read,
+                         "write": self.timeout.write, "pool": self.timeout.pool},
+        }
+
+
+backend_client = ResilientBackendClient()
@@ -0,0 +1,95 @@
+import asyncio
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from client.logger import logger
+from client.models import Hero
+from client.services.token_storage import get_stored_token
+
+
+class HeroMirror:
+    """
+    Local copy of the heroes on the server, kept up to date by long-polling the server's change feed
+    instead of downloading the full list on every request.
+    """
+
+    def __init__(self, request_backend: Callable[..., Awaitable], poll_timeout: float = 8.0):
+        self.request_backend = request_backend
+        self.poll_timeout = poll_timeout
+        self.heroes: Dict[str, Hero] = {}
+        self.sequence: Optional[int] = None
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def synced(self) -> bool:
+        return self.sequence is not None
+
+    def list_heroes(self) -> List[Hero]:
+        return list(self.heroes.values())
+
+    async def _resync(self) -> None:
+        # Take the current sequence number before listing, replaying changes that are already part of the
+        # list afterwards is harmless as applying them is idempotent
+        sequence = (await self.request_backend("GET", "/heroes/changes?timeout=0"))["sequence"]
+        heroes = await self.request_backend("GET", "/heroes/")
+        self.heroes = {hero["id"]: Hero(**hero) for hero in heroes}
+        self.sequence = sequence
+        logger.info(f"Hero mirror synced with {len(self.heroes)} heroes at sequence {sequence}")
+
+    def apply_created(self, hero: dict) -> None:
+        """Applies a hero created through this client right away, so that it shows up before the feed reports it."""
+        if self.synced:
+            self.heroes[hero["id"]] = Hero(**hero)
+
+    def apply_deleted(self, hero_id: str) -> None:
+        """Applies a hero deleted through this client right away, so that it is gone before the feed reports it."""
+        if self.synced:
+            self.heroes.pop(hero_id, None)
+
+    def _apply(self, changes: List[dict]) -> None:
+        for change in changes:
+            if change["type"] == "created":
+                self.heroes[change["hero_id"]] = Hero(**change["hero"])
+            elif change["type"] == "deleted":
+                self.heroes.pop(change["hero_id"], None)
+
+    async def run(self) -> None:
+        while True:
+            # Nothing can be fetched until the user has logged in
+            if not get_stored_token():
+                self.sequence = None
+                await asyncio.sleep(1)
+                continue
+
+            try:
+                if self.sequence is None:
+                    await self._resync()
+
+                batch = await self.request_backend(
+                    "GET", f"/heroes/changes?since={self.sequence}&timeout={self.poll_timeout:g}", long_poll=True
+                )
+                if batch["reset"]:
+                    logger.warning("Hero mirror fell behind the change feed, resyncing")
+                    self.sequence = None
+                    continue
+
+                self._apply(batch["changes"])
+                self.sequence = batch["sequence"]
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Failed to update hero mirror, falling back to the server: {e}")
+                self.sequence = None
+                await asyncio.sleep(5)
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self.run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
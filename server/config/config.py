@@ -1,4 +1,35 @@
 import os
+import tempfile
+from typing import Dict, List, Optional, Tuple
+
+
+def parse_scope_rate_limits(value: str) -> Dict[str, Tuple[float, float]]:
+    """
+    Parses a comma-separated list of 'Scope=rate:burst' entries into a mapping of scope to
+    (tokens per second, bucket capacity), e.g. 'Heroes.Read=20:40,Heroes.Write=2:5'.
+    """
+    limits = {}
+    for entry in filter(None, (part.strip() for part in value.split(","))):
+        scope, _, limit = entry.partition("=")
+        rate, _, burst = limit.partition(":")
+        limits[scope.strip()] = (float(rate), float(burst or rate))
+    return limits
+
+
+def parse_list(value: Optional[str], default: List[Optional[str]]) -> List[str]:
+    """Parses a comma-separated list, falling back to the non-empty entries of `default` if it is unset."""
+    if value:
+        return [entry.strip() for entry in value.split(",") if entry.strip()]
+    return [entry for entry in default if entry]
+
+
+def issuers_for_tenants(tenant_ids: List[str]) -> Dict[str, str]:
+    """Maps the v2.0 and v1.0 token issuers of each tenant to its tenant ID."""
+    issuers = {}
+    for tenant_id in tenant_ids:
+        issuers[f"https://login.microsoftonline.com/{tenant_id}/v2.0"] = tenant_id
+        issuers[f"https://sts.windows.net/{tenant_id}/"] = tenant_id
+    return issuers
 
 
 class AzureConfig:
@@ -7,3 +38,36 @@ class AzureConfig:
     AUTHORITY = f"https://login.microsoftonline.com/{TENANT_ID}"
     AUTHORIZATION_URL = f"{AUTHORITY}/oauth2/v2.0/authorize"
     TOKEN_URL = f"{AUTHORITY}/oauth2/v2.0/token"
+
+    # Tenants and app registrations whose tokens are accepted, defaulting to the single ones above
+    ALLOWED_TENANT_IDS = parse_list(os.getenv("HVALFANGST_ALLOWED_TENANT_IDS"), [TENANT_ID])
+    ALLOWED_AUDIENCES = parse_list(os.getenv("HVALFANGST_ALLOWED_AUDIENCES"), [SERVER_CLIENT_ID])
+    ALLOWED_ISSUERS = issuers_for_tenants(ALLOWED_TENANT_IDS)
+
+
+class KeyCacheConfig:
+    MAX_KEYS_PER_ISSUER = int(os.getenv("HVALFANGST_MAX_KEYS_PER_ISSUER", "16"))
+    KEYS_TTL_SECONDS = float(os.getenv("HVALFANGST_KEYS_TTL_SECONDS", "86400"))
+    MIN_REFRESH_INTERVAL_SECONDS = float(os.getenv("HVALFANGST_KEYS_MIN_REFRESH_INTERVAL_SECONDS", "300"))
+
+
+class AdmissionConfig:
+    MAX_IN_FLIGHT_PER_ROUTE = int(os.getenv("HVALFANGST_MAX_IN_FLIGHT_PER_ROUTE", "32"))
+    TARGET_QUEUE_DELAY_MS = int(os.getenv("HVALFANGST_TARGET_QUEUE_DELAY_MS", "100"))
+    MAX_TRACKED_PRINCIPALS = int(os.getenv("HVALFANGST_MAX_TRACKED_PRINCIPALS", "10000"))
+    SCOPE_RATE_LIMITS = parse_scope_rate_limits(
+        os.getenv("HVALFANGST_SCOPE_RATE_LIMITS", "Heroes.Read=20:40,Heroes.Write=2:5,Heroes.Delete=2:5")
+    )
+
+
+class ProfilingConfig:
+    OUTPUT_DIR = os.getenv("HVALFANGST_PROFILE_DIR", os.path.join(tempfile.gettempdir(), "hvalfangst-profiles"))
+    TRACE_HEADER = os.getenv("HVALFANGST_TRACE_HEADER", "X-Hvalfangst-Trace")
+    TRACE_ENABLED = os.getenv("HVALFANGST_TRACE_ENABLED", "0") == "1"
+
+
+class ChangeFeedConfig:
+    BUFFER_SIZE = int(os.getenv("HVALFANGST_CHANGE_FEED_BUFFER_SIZE", "1024"))
+    MAX_WAIT_SECONDS = float(os.getenv("HVALFANGST_CHANGE_FEED_MAX_WAIT_SECONDS", "30"))
+    KEEPALIVE_SECONDS = float(os.getenv("HVALFANGST_CHANGE_FEED_KEEPALIVE_SECONDS", "15"))
+    MAX_SUBSCRIBERS = int(os.getenv("HVALFANGST_CHANGE_FEED_MAX_SUBSCRIBERS", "256"))
@@ -1,7 +1,9 @@
 from fastapi import FastAPI
 
+from config.config import AdmissionConfig, ProfilingConfig
 from logger import logger
-from routers import heroes
+from middleware import AdmissionControlMiddleware, ProfilingMiddleware
+from routers import admin, heroes
 
 app = FastAPI(
     title="Hvalfangst Resource Server",
@@ -9,6 +11,19 @@ app = FastAPI(
     version="1.0.0"
 )
 
+app.add_middleware(
+    ProfilingMiddleware,
+    profiler=admin.profiler,
+    trace_header=ProfilingConfig.TRACE_HEADER,
+    trace_enabled=ProfilingConfig.TRACE_ENABLED
+)
+app.add_middleware(
+    AdmissionControlMiddleware,
+    max_in_flight=AdmissionConfig.MAX_IN_FLIGHT_PER_ROUTE,
+    target_queue_delay_ms=AdmissionConfig.TARGET_QUEUE_DELAY_MS,
+    exempt_routes=["GET /api/heroes/changes"]
+)
+
 logger.info("Starting up API")
 
 
@@ -18,3 +33,4 @@ async def index():
 
 
 app.include_router(heroes.router, prefix="/api", tags=["Heroes"])
+app.include_router(admin.router, prefix="/api/admin", tags=["Admin"])
@@ -0,0 +1,4 @@
+from .admission import AdmissionControlMiddleware
+from .profiling import ProfilingMiddleware
+
+__all__ = ["AdmissionControlMiddleware", "ProfilingMiddleware"]
\ No newline at end of file
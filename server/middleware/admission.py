@@ -0,0 +1,65 @@
+import asyncio
+import math
+from typing import Dict, Iterable
+
+from starlette.responses import JSONResponse
+from starlette.routing import Match
+from starlette.types import ASGIApp, Receive, Scope, Send
+from logger import *
+
+
+class AdmissionControlMiddleware:
+    """
+    Caps the number of in-flight requests per route. Requests arriving at a saturated route wait for a free
+    slot for at most `target_queue_delay_ms`, after which they are shed with a 503 and a 'Retry-After' header
+    instead of queueing behind the lock and the auth pipeline.
+    Long-lived routes such as streams and long-polls are listed in `exempt_routes` (e.g. 'GET /api/heroes/changes'),
+    as they would otherwise hold a slot for the whole wait. Those routes have to bound their consumers themselves.
+    """
+
+    def __init__(self, app: ASGIApp, max_in_flight: int = 32, target_queue_delay_ms: int = 100,
+                 exempt_routes: Iterable[str] = ()):
+        self.app = app
+        self.max_in_flight = max_in_flight
+        self.target_queue_delay = target_queue_delay_ms / 1000
+        self.exempt_routes = set(exempt_routes)
+        self.slots: Dict[str, asyncio.Semaphore] = {}
+
+    def _route_key(self, scope: Scope):
+        # Routing has not happened yet at this point, so resolve the route template ourselves
+        for route in scope["app"].router.routes:
+            match, _ = route.matches(scope)
+            if match == Match.FULL:
+                return f"{scope['method']} {route.path}"
+        return None
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        route_key = self._route_key(scope)
+        if route_key is None or route_key in self.exempt_routes:
+            await self.app(scope, receive, send)
+            return
+
+        slots = self.slots.get(route_key)
+        if slots is None:
+            slots = self.slots[route_key] = asyncio.Semaphore(self.max_in_flight)
+
+        try:
+            await asyncio.wait_for(slots.acquire(), timeout=self.target_queue_delay)
+        except asyncio.TimeoutError:
+            logger.warning(f"Shedding request to '{route_key}': queueing delay exceeded target")
+            response = JSONResponse(
+                status_code=503,
+                content={"detail": "Server is overloaded, please retry later"},
+                headers={"Retry-After": str(max(1, math.ceil(self.target_queue_delay)))},
+            )
+            await response(scope, receive, send)
+            return
+
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            slots.release()
@@ -1,4 +1,6 @@
 from .hero import Hero
+from .hero_change import HeroChange, HeroChanges
+from .hero_stats import HeroStats, HeroStatsGroup
 from .decoded_token import DecodedToken
 
-__all__ = ["Hero", "DecodedToken"]
\ No newline at end of file
+__all__ = ["Hero", "HeroChange", "HeroChanges", "HeroStats", "HeroStatsGroup", "DecodedToken"]
\ No newline at end of file
@@ -0,0 +1,17 @@
+from typing import List, Optional
+from pydantic import BaseModel
+
+from .hero import Hero
+
+
+class HeroChange(BaseModel):
+    sequence: int  # Monotonically increasing sequence number of the change
+    type: str  # Either 'created' or 'deleted'
+    hero_id: str
+    hero: Optional[Hero] = None  # Only set for 'created' changes
+
+
+class HeroChanges(BaseModel):
+    sequence: int  # Sequence number of the latest change, to be passed as 'since' on the next request
+    reset: bool = False  # True if changes were dropped from the buffer and the full list has to be fetched again
+    changes: List[HeroChange] = []
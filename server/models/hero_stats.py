@@ -0,0 +1,18 @@
+from typing import Dict, List, Optional, Union
+from pydantic import BaseModel
+
+
+class HeroStatsGroup(BaseModel):
+    key: Dict[str, Union[int, str]]  # Values of the grouping dimensions, e.g. {"race": "Elf"}
+    count: int
+    average_hit_points: Optional[float] = None
+    average_armor_class: Optional[float] = None
+
+
+class HeroStats(BaseModel):
+    count: int
+    average_hit_points: Optional[float] = None  # None if there are no heroes
+    average_armor_class: Optional[float] = None
+    group_by: List[str] = []
+    groups: List[HeroStatsGroup] = []
+    consistent: Optional[bool] = None  # Only set if a consistency check was requested
@@ -0,0 +1,3 @@
+from .profiler import RequestProfiler, RequestTrace, mark_authenticated, request_trace, stage
+
+__all__ = ["RequestProfiler", "RequestTrace", "mark_authenticated", "request_trace", "stage"]
\ No newline at end of file
@@ -0,0 +1,179 @@
+import asyncio
+import cProfile
+import os
+import sys
+import threading
+import time
+from collections import Counter, deque
+from contextvars import ContextVar
+from typing import Dict, Optional
+
+from logger import *
+
+
+class RequestTrace:
+    """Per-stage timings (in milliseconds) of a request marked for tracing."""
+    __slots__ = ("timings", "authenticated")
+
+    def __init__(self):
+        self.timings: Dict[str, float] = {}
+
+        # Set once the request has been authorized, stages of the auth pipeline are only reported after that
+        self.authenticated = False
+
+
+# Trace of the current request, only set for requests marked for tracing
+request_trace: ContextVar[Optional[RequestTrace]] = ContextVar("request_trace", default=None)
+
+
+class _NoopStage:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+class _Stage:
+    __slots__ = ("timings", "name", "started")
+
+    def __init__(self, timings: Dict[str, float], name: str):
+        self.timings = timings
+        self.name = name
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        elapsed = (time.perf_counter() - self.started) * 1000
+        self.timings[self.name] = self.timings.get(self.name, 0.0) + elapsed
+        return False
+
+
+_NOOP_STAGE = _NoopStage()
+
+
+def stage(name: str):
+    """
+    Times a stage of the current request if it has been marked for tracing.
+    Requests which are not traced get a shared no-op context manager.
+    """
+    trace = request_trace.get()
+    if trace is None:
+        return _NOOP_STAGE
+    return _Stage(trace.timings, name)
+
+
+def mark_authenticated() -> None:
+    """Marks the current request, if traced, as having been authorized."""
+    trace = request_trace.get()
+    if trace is not None:
+        trace.authenticated = True
+
+
+class SamplingProfiler:
+    """
+    Samples the stack of the event loop thread at a fixed interval from a background thread.
+    Stacks are written in the collapsed format understood by speedscope and flamegraph.pl.
+    """
+
+    def __init__(self, interval: float = 0.005):
+        self.interval = interval
+        self.target_thread = threading.get_ident()
+        self.stacks: Counter = Counter()
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.target_thread)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                frame = frame.f_back
+            if stack:
+                self.stacks[";".join(reversed(stack))] += 1
+
+    def enable(self):
+        self._thread.start()
+
+    def disable(self):
+        self._stopped.set()
+        self._thread.join()
+
+    def dump_stats(self, path: str):
+        with open(path, "w") as f:
+            for stack, count in self.stacks.items():
+                f.write(f"{stack} {count}\n")
+
+
+class RequestProfiler:
+    """
+    Profiles the process for the next N requests or for T seconds, whichever comes first, using either
+    cProfile (dumped as .pstats) or a sampling profiler (dumped as collapsed stacks).
+    While no session is active nothing is installed, so requests pay no profiling overhead.
+    """
+
+    MODES = {"cprofile": ".pstats", "sample": ".collapsed"}
+
+    def __init__(self, output_dir: str, max_dumps: int = 20):
+        self.output_dir = output_dir
+        self.dumps = deque(maxlen=max_dumps)
+        self.session: Optional[dict] = None
+
+    def start(self, mode: str = "cprofile", max_requests: int = 100, max_seconds: float = 60.0) -> dict:
+        if mode not in self.MODES:
+            raise ValueError(f"Unknown profiling mode '{mode}', expected one of {sorted(self.MODES)}")
+        if self.session is not None:
+            raise RuntimeError("A profiling session is already active")
+
+        profiler = cProfile.Profile() if mode == "cprofile" else SamplingProfiler()
+        self.session = {
+            "mode": mode,
+            "max_requests": max_requests,
+            "requests": 0,
+            "started_at": time.time(),
+            "deadline": time.monotonic() + max_seconds,
+            "profiler": profiler,
+            "timer": asyncio.get_running_loop().call_later(max_seconds, self.stop),
+        }
+        profiler.enable()
+        logger.info(f"Profiling started ({mode}) for {max_requests} requests or {max_seconds} seconds")
+        return self.status()
+
+    def request_finished(self) -> None:
+        session = self.session
+        if session is None:
+            return
+        session["requests"] += 1
+        if session["requests"] >= session["max_requests"] or time.monotonic() >= session["deadline"]:
+            self.stop()
+
+    def stop(self) -> Optional[str]:
+        session, self.session = self.session, None
+        if session is None:
+            return None
+        session["timer"].cancel()
+        session["profiler"].disable()
+
+        os.makedirs(self.output_dir, exist_ok=True)
+        file_name = time.strftime("profile-%Y%m%d-%H%M%S", time.localtime(session["started_at"]))
+        path = os.path.join(self.output_dir, f"{file_name}-{os.getpid()}{self.MODES[session['mode']]}")
+        session["profiler"].dump_stats(path)
+        self.dumps.append(path)
+        logger.info(f"Profiling stopped after {session['requests']} requests, written to {path}")
+        return path
+
+    def status(self) -> dict:
+        session = self.session
+        return {
+            "active": session is not None,
+            "mode": session["mode"] if session else None,
+            "requests": session["requests"] if session else 0,
+            "max_requests": session["max_requests"] if session else 0,
+            "dumps": list(self.dumps),
+        }
@@ -1 +1 @@
-__all__ = ["heroes"]
+__all__ = ["heroes", "admin"]
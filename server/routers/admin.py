@@ -0,0 +1,39 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from security.jwt_utils import oauth2_scheme
+from security.auth import authorize
+from profiling import RequestProfiler
+from config.config import ProfilingConfig
+
+router = APIRouter()
+profiler = RequestProfiler(ProfilingConfig.OUTPUT_DIR)
+
+
+# GET: Current profiling session and the most recent dumps
+@router.get("/profiling", response_model=dict)
+async def profiling_status(token: str = Depends(oauth2_scheme)):
+    await authorize(token, ["Heroes.Admin"])
+    return profiler.status()
+
+
+# POST: Profile the next N requests or T seconds, whichever comes first
+@router.post("/profiling", response_model=dict)
+async def start_profiling(
+        mode: str = Query("cprofile", pattern="^(cprofile|sample)$"),
+        requests: int = Query(100, ge=1, le=100000),
+        seconds: float = Query(60.0, gt=0, le=3600),
+        token: str = Depends(oauth2_scheme)):
+    await authorize(token, ["Heroes.Admin"])
+    try:
+        return profiler.start(mode, requests, seconds)
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+
+# DELETE: Stop the active profiling session and write its dump
+@router.delete("/profiling", response_model=dict)
+async def stop_profiling(token: str = Depends(oauth2_scheme)):
+    await authorize(token, ["Heroes.Admin"])
+    path = profiler.stop()
+    if path is None:
+        raise HTTPException(status_code=404, detail="No active profiling session")
+    return {"dump": path}
@@ -1,15 +1,17 @@
 from http.client import HTTPException
-from typing import List
-from fastapi import APIRouter, Depends
+from typing import List, Literal, Optional
+from fastapi import APIRouter, Depends, Header, Query, Request
 from fastapi import HTTPException
+from fastapi.responses import StreamingResponse
 from models import *
 from services import *
 from security.jwt_utils import oauth2_scheme
 from security.auth import authorize
-from config.config import AzureConfig
+from config.config import AzureConfig, ChangeFeedConfig
+from profiling import stage
 
 router = APIRouter()
-hero_service = HeroService()
+hero_service = HeroService(ChangeFeedConfig.BUFFER_SIZE)
 
 
 
@@ -17,14 +19,96 @@ hero_service = HeroService()
 @router.post("/heroes/", response_model=Hero)
 async def create_hero(hero: Hero, token: str = Depends(oauth2_scheme)):
     await authorize(token, ["Heroes.Write"])
-    return await hero_service.create_hero(hero)
+    with stage("hero_service"):
+        return await hero_service.create_hero(hero)
+
+
+# GET: Change feed of created and deleted heroes, either as server-sent events or by long-polling
+# (declared before '/heroes/{hero_id}' so that 'changes' is not taken for a hero ID)
+@router.get("/heroes/changes", response_model=HeroChanges)
+async def read_hero_changes(
+        request: Request,
+        since: Optional[int] = Query(None, ge=0),
+        timeout: float = Query(ChangeFeedConfig.MAX_WAIT_SECONDS, ge=0, le=ChangeFeedConfig.MAX_WAIT_SECONDS),
+        last_event_id: Optional[str] = Header(None),
+        token: str = Depends(oauth2_scheme)):
+    await authorize(token, ["Heroes.Read"])
+
+    # Resume from the query parameter or the 'Last-Event-ID' header sent by reconnecting EventSource clients
+    if since is None and last_event_id and last_event_id.isdigit():
+        since = int(last_event_id)
+    if since is None:
+        since = hero_service.sequence
+
+    # The feed is exempt from admission control, so the number of waiting consumers is bounded here instead
+    if hero_service.subscribers >= ChangeFeedConfig.MAX_SUBSCRIBERS:
+        raise HTTPException(
+            status_code=503,
+            detail="Too many change feed subscribers, please retry later",
+            headers={"Retry-After": str(max(1, int(ChangeFeedConfig.KEEPALIVE_SECONDS)))},
+        )
+
+    # Counted before anything is awaited, so that concurrent requests cannot all pass the check above
+    hero_service.subscribers += 1
+
+    if "text/event-stream" in request.headers.get("accept", ""):
+        return ChangeFeedStreamingResponse(stream_hero_changes(since), media_type="text/event-stream",
+                                           headers={"Cache-Control": "no-cache"})
+
+    try:
+        return await hero_service.wait_for_changes(since, timeout)
+    finally:
+        hero_service.subscribers -= 1
+
+
+# GET: Statistics over all heroes, optionally grouped by race, class and/or level
+# (declared before '/heroes/{hero_id}' so that 'stats' is not taken for a hero ID)
+@router.get("/heroes/stats", response_model=HeroStats)
+async def read_hero_stats(
+        group_by: List[Literal["race", "class_", "level"]] = Query([]),
+        verify: bool = False,
+        token: str = Depends(oauth2_scheme)):
+    await authorize(token, ["Heroes.Read"])
+    with stage("hero_service"):
+        return await hero_service.get_statistics(group_by, verify)
+
+
+async def stream_hero_changes(sequence: int):
+    """
+    Streams changes as server-sent events. Each consumer only holds a cursor into the shared ring buffer and the next
+    batch is not read until the previous one has been sent, so slow consumers cannot make the server buffer on their
+    behalf. Consumers that fall behind the ring buffer receive a 'reset' event and have to re-fetch the full list.
+    """
+    while True:
+        batch = await hero_service.wait_for_changes(sequence, ChangeFeedConfig.KEEPALIVE_SECONDS)
+        if batch.reset:
+            yield f"id: {batch.sequence}\nevent: reset\ndata: {batch.model_dump_json()}\n\n"
+        elif not batch.changes:
+            yield ": keepalive\n\n"
+        for change in batch.changes:
+            yield f"id: {change.sequence}\nevent: {change.type}\ndata: {change.model_dump_json()}\n\n"
+        sequence = batch.sequence
+
+
+class ChangeFeedStreamingResponse(StreamingResponse):
+    """
+    Streaming response which gives up its change feed subscription once the stream has ended, however it ended.
+    This includes clients disconnecting before the first event, in which case the generator is never started.
+    """
+
+    async def __call__(self, scope, receive, send) -> None:
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            hero_service.subscribers -= 1
 
 
 # GET: Retrieve a hero by ID
 @router.get("/heroes/{hero_id}", response_model=Hero)
 async def read_hero(hero_id: str, token: str = Depends(oauth2_scheme)):
     await authorize(token, ["Heroes.Read"])
-    hero = await hero_service.get_hero(hero_id)
+    with stage("hero_service"):
+        hero = await hero_service.get_hero(hero_id)
     if hero:
         return hero
     else:
@@ -35,14 +119,16 @@ async def read_hero(hero_id: str, token: str = Depends(oauth2_scheme)):
 @router.get("/heroes/", response_model=List[Hero])
 async def read_heroes(token: str = Depends(oauth2_scheme)):
     await authorize(token, ["Heroes.Read"])
-    return await hero_service.list_heroes()
+    with stage("hero_service"):
+        return await hero_service.list_heroes()
 
 
 # DELETE: Delete a hero by ID
 @router.delete("/heroes/{hero_id}", response_model=dict)
 async def delete_hero(hero_id: str, token: str = Depends(oauth2_scheme)):
     await authorize(token, ["Heroes.Delete"])
-    success = await hero_service.delete_hero(hero_id)
+    with stage("hero_service"):
+        success = await hero_service.delete_hero(hero_id)
     if success:
         return {"message": f"Hero with id '{hero_id}' deleted successfully"}
     else:
@@ -4,15 +4,22 @@ from fastapi import HTTPException
 from logger import *
 from models import *
 from starlette import status
+from config.config import AdmissionConfig
+from profiling import mark_authenticated, stage
 from .jwt_utils import verify_token_signature
+from .rate_limiter import PrincipalRateLimiter
+
+rate_limiter = PrincipalRateLimiter(AdmissionConfig.SCOPE_RATE_LIMITS, AdmissionConfig.MAX_TRACKED_PRINCIPALS)
 
 
 async def authorize(token: str, required_scopes: List[str]):
     """
-    Verifies that the provided token contains the required scopes for the action.
+    Verifies that the provided token contains the required scopes for the action and that the
+    principal has not exhausted its rate limit for them.
     """
     # Decode and verify the token
-    decoded_token = await verify_token_signature(token)
+    with stage("auth"):
+        decoded_token = await verify_token_signature(token)
 
     logger.info(decoded_token)
 
@@ -28,3 +35,11 @@ async def authorize(token: str, required_scopes: List[str]):
 
     # Log success if the token has all required scopes
     logger.info(f"Token has required scopes: {required_scopes}.")
+
+    # Apply the per-principal rate limits of the required scopes
+    rate_limiter.acquire(decoded_token, required_scopes)
+
+    # Only now may a traced request be told how long the auth pipeline took
+    mark_authenticated()
+
+    return decoded_token
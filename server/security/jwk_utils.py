@@ -1,5 +1,8 @@
+import asyncio
 import json
-from typing import List, Dict, Any
+import time
+from collections import OrderedDict
+from typing import List, Dict, Any, Optional
 
 import httpx
 from fastapi import HTTPException
@@ -8,28 +11,124 @@ from logger import *
 from models import *
 from starlette import status
 
+from config.config import AzureConfig, KeyCacheConfig
 from .token_validator import get_openid_config
 
 
-async def fetch_jwk_for_kid(kid: str) -> dict:
+class IssuerKeyCache:
     """
-    Fetches the JWK (JSON Web Key) for the given key ID (kid).
-    Retrieves a list of public JWKs from the OpenID configuration, then matches the 'kid'.
+    Public keys of a single issuer (tenant), converted to RSA public keys once and kept in a bounded LRU cache.
+    The keys are refreshed from the issuer's discovery document and JWKS when they are older than `ttl`, or when
+    an unknown 'kid' is seen. Refreshes are attempted at most once per `min_refresh_interval`, whether they succeed
+    or not, so that neither tokens with made-up key IDs nor an outage of the issuer can make us hammer it. While
+    refreshing fails, the keys cached last keep being used. Only while no keys have been fetched yet is a failed
+    refresh retried on the next request, as there is nothing to fall back on.
     """
-    logger.info("Fetching JWKs from OpenID configuration.")
-    public_jwks = await get_public_jwks()
-    logger.info(f"Fetched {len(public_jwks)} JWKs.")
-
-    jwk = next((jwk for jwk in public_jwks if jwk['kid'] == kid), None)
-    if not jwk:
-        logger.error(f"No JWK found for kid: {kid}")
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Public key not found",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
-    logger.info(f"Matching JWK found for kid: {kid}")
-    return jwk
+
+    def __init__(self, tenant_id: str, max_keys: int, ttl: float, min_refresh_interval: float):
+        self.authority = f"https://login.microsoftonline.com/{tenant_id}"
+        self.max_keys = max_keys
+        self.ttl = ttl
+        self.min_refresh_interval = min_refresh_interval
+        self.keys: "OrderedDict[str, Any]" = OrderedDict()
+        self.fetched_at: Optional[float] = None
+        self.attempted_at: Optional[float] = None
+        self.lock = asyncio.Lock()
+
+    def _lookup(self, kid: str, now: float, allow_stale: bool = False):
+        if self.fetched_at is None or (now - self.fetched_at >= self.ttl and not allow_stale):
+            return None
+        key = self.keys.get(kid)
+        if key is not None:
+            self.keys.move_to_end(kid)
+        return key
+
+    async def get_key(self, kid: str):
+        key = self._lookup(kid, time.monotonic())
+        if key is not None:
+            return key
+
+        # Only one request refreshes the keys, the others wait for it and look again
+        async with self.lock:
+            now = time.monotonic()
+            key = self._lookup(kid, now)
+            if key is None and (self.attempted_at is None
+                                or now - self.attempted_at >= min(self.min_refresh_interval, self.ttl)):
+                self.attempted_at = now
+                try:
+                    await self.refresh()
+                except Exception as e:
+                    if not self.keys:
+                        # Without keys to fall back on the next request has to try again, rather than
+                        # rejecting every token until the refresh interval has passed
+                        self.attempted_at = None
+                        raise
+                    logger.warning(f"Failed to refresh public keys of {self.authority}, using cached keys: {e}")
+                key = self._lookup(kid, time.monotonic())
+
+            # Fall back to expired keys if they could not be refreshed
+            if key is None:
+                key = self._lookup(kid, now, allow_stale=True)
+
+        if key is None:
+            logger.error(f"No JWK found for kid: {kid}")
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Public key not found",
+                headers={"WWW-Authenticate": "Bearer"},
+            )
+        logger.info(f"Matching JWK found for kid: {kid}")
+        return key
+
+    async def refresh(self) -> None:
+        published = {jwk["kid"]: jwk for jwk in await get_public_jwks(self.authority) if jwk.get("kty") == "RSA"}
+
+        # Drop keys the issuer no longer publishes and convert the new ones
+        for kid in [kid for kid in self.keys if kid not in published]:
+            del self.keys[kid]
+        for kid, jwk in published.items():
+            if kid not in self.keys:
+                self.keys[kid] = convert_jwk_to_rsa_public_key(jwk)
+        while len(self.keys) > self.max_keys:
+            self.keys.popitem(last=False)
+
+        self.fetched_at = time.monotonic()
+        logger.info(f"Cached {len(self.keys)} public keys of {self.authority}.")
+
+
+class IssuerKeyRegistry:
+    """
+    Independent key caches for each allowed tenant, created on first use. Caches are never created for
+    tenants outside of the allowed set, so their number is bounded by the configuration.
+    """
+
+    def __init__(self, tenant_ids: List[str]):
+        self.tenant_ids = set(tenant_ids)
+        self.caches: Dict[str, IssuerKeyCache] = {}
+
+    def get_cache(self, tenant_id: str) -> IssuerKeyCache:
+        if tenant_id not in self.tenant_ids:
+            raise KeyError(tenant_id)
+        cache = self.caches.get(tenant_id)
+        if cache is None:
+            cache = self.caches[tenant_id] = IssuerKeyCache(
+                tenant_id,
+                KeyCacheConfig.MAX_KEYS_PER_ISSUER,
+                KeyCacheConfig.KEYS_TTL_SECONDS,
+                KeyCacheConfig.MIN_REFRESH_INTERVAL_SECONDS
+            )
+        return cache
+
+
+issuer_keys = IssuerKeyRegistry(AzureConfig.ALLOWED_TENANT_IDS)
+
+
+async def fetch_rsa_public_key(tenant_id: str, kid: str):
+    """
+    Returns the RSA public key for the given key ID (kid) of the given tenant, fetching the tenant's
+    JWKs from its OpenID configuration unless they are cached already.
+    """
+    return await issuer_keys.get_cache(tenant_id).get_key(kid)
 
 
 def convert_jwk_to_rsa_public_key(jwk: dict) -> RSAAlgorithm:
@@ -42,16 +141,16 @@ def convert_jwk_to_rsa_public_key(jwk: dict) -> RSAAlgorithm:
     return rsa_public_key
 
 
-async def get_public_jwks() -> List[Dict[str, Any]]:
+async def get_public_jwks(authority: str = AzureConfig.AUTHORITY) -> List[Dict[str, Any]]:
     """
-    Fetches public keys from the OpenID configuration.
+    Fetches public keys from the OpenID configuration of the given authority.
 
     Returns:
         List of dictionaries, each representing a public key.
     """
     logger.info("Fetching public keys from OpenID configuration.")
     try:
-        config: Dict[str, Any] = await get_openid_config()
+        config: Dict[str, Any] = await get_openid_config(authority)
         logger.info(config)
 
         async with httpx.AsyncClient() as client:
@@ -71,5 +170,4 @@ async def get_public_jwks() -> List[Dict[str, Any]]:
         raise
     except Exception as e:
         logger.exception(f"An unexpected error occurred while fetching public keys: {e}")
-        raisexception(f"An unexpected error occurred while fetching public keys: {e}")
         raise
@@ -7,8 +7,9 @@ from jwt import ExpiredSignatureError, MissingRequiredClaimError, PyJWTError
 from logger import *
 from models import *
 from starlette import status
-from .jwk_utils import fetch_jwk_for_kid, convert_jwk_to_rsa_public_key
+from .jwk_utils import fetch_rsa_public_key
 from config.config import AzureConfig
+from profiling import stage
 
 oauth2_scheme = OAuth2AuthorizationCodeBearer(
     authorizationUrl=f"{AzureConfig.AUTHORITY}/oauth2/v2.0/authorize",
@@ -38,19 +39,41 @@ async def verify_token_signature(token: str = Depends(oauth2_scheme)) -> Decoded
             )
         logger.info(f"Token 'kid' identified: {kid}")
 
-        # Step 3: Retrieve the matching JWK (JSON Web Key) for the 'kid'
-        jwk = await fetch_jwk_for_kid(kid)
-
-        # Step 4: Convert the JWK to an RSA public key
-        rsa_public_key = convert_jwk_to_rsa_public_key(jwk)
-
-        # Step 5: Verify the token's signature, decode the payload and ensure that the audience is correct
-        verified_payload = jwt.decode(
-            token,
-            rsa_public_key,
-            algorithms=["RS256"],
-            audience=AzureConfig.SERVER_CLIENT_ID
-        )
+        # Step 3: Reject tokens of unknown issuers and audiences based on the unverified claims,
+        # before spending any network round trips or crypto on them
+        unverified_claims = decode_jwt_payload(token)
+        issuer = unverified_claims.get("iss")
+        tenant_id = AzureConfig.ALLOWED_ISSUERS.get(issuer)
+        if tenant_id is None or unverified_claims.get("tid") != tenant_id:
+            logger.error(f"Token issued by untrusted issuer: {issuer}")
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Invalid JWT: untrusted issuer",
+                headers={"WWW-Authenticate": "Bearer"},
+            )
+        audience = unverified_claims.get("aud")
+        if audience not in AzureConfig.ALLOWED_AUDIENCES:
+            logger.error(f"Token issued for unexpected audience: {audience}")
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Invalid JWT: unexpected audience",
+                headers={"WWW-Authenticate": "Bearer"},
+            )
+        logger.info(f"Token issued by trusted issuer: {issuer}")
+
+        # Step 4: Retrieve the RSA public key for the 'kid' from the key cache of the issuer's tenant
+        with stage("jwks"):
+            rsa_public_key = await fetch_rsa_public_key(tenant_id, kid)
+
+        with stage("jwt_verify"):
+            # Step 5: Verify the token's signature, decode the payload and ensure that the issuer and audience are correct
+            verified_payload = jwt.decode(
+                token,
+                rsa_public_key,
+                algorithms=["RS256"],
+                audience=AzureConfig.ALLOWED_AUDIENCES,
+                issuer=issuer
+            )
 
         logger.info(f"Token signature successfully verified with public key (kid: {kid})")
 
@@ -92,6 +115,9 @@ async def verify_token_signature(token: str = Depends(oauth2_scheme)) -> Decoded
             detail="Invalid signature",
             headers={"WWW-Authenticate": "Bearer"},
         )
+    except HTTPException:
+        # Rejections raised above already carry their status and detail
+        raise
     except Exception as e:
         logger.exception("An unexpected error occurred while verifying the token.")
         raise HTTPException(
@@ -0,0 +1,77 @@
+import math
+import time
+from collections import OrderedDict
+from typing import Dict, List, Tuple
+
+from fastapi import HTTPException
+from logger import *
+from models import *
+from starlette import status
+
+
+class TokenBucket:
+    """
+    Token bucket holding the remaining allowance of a single principal for a single scope.
+    Slots keep the per-principal footprint down to two floats.
+    """
+    __slots__ = ("tokens", "updated")
+
+    def __init__(self, tokens: float, updated: float):
+        self.tokens = tokens
+        self.updated = updated
+
+
+class PrincipalRateLimiter:
+    """
+    Applies per-scope token bucket limits to verified principals, keyed by the token's 'oid' and 'azp' claims.
+    At most `max_principals` buckets are kept; the least recently used bucket is evicted first. Evicted buckets
+    have usually refilled completely already, so recreating them as full is equivalent to keeping them.
+    """
+
+    def __init__(self, limits: Dict[str, Tuple[float, float]], max_principals: int = 10000):
+        self.limits = limits
+        self.max_principals = max_principals
+        self.buckets: "OrderedDict[Tuple[str, str, str], TokenBucket]" = OrderedDict()
+
+    def _bucket(self, key: Tuple[str, str, str], capacity: float, now: float) -> TokenBucket:
+        bucket = self.buckets.get(key)
+        if bucket is None:
+            bucket = TokenBucket(capacity, now)
+            self.buckets[key] = bucket
+            if len(self.buckets) > self.max_principals:
+                self.buckets.popitem(last=False)
+        else:
+            self.buckets.move_to_end(key)
+        return bucket
+
+    def acquire(self, decoded_token: DecodedToken, required_scopes: List[str]) -> None:
+        """
+        Consumes one token from every bucket limiting the required scopes.
+        Raises a 429 with a 'Retry-After' header if any of them is empty, in which case nothing is consumed.
+        """
+        limited = [scope for scope in required_scopes if scope in self.limits]
+        if not limited:
+            return
+
+        now = time.monotonic()
+        buckets = []
+        for scope in limited:
+            rate, capacity = self.limits[scope]
+            bucket = self._bucket((decoded_token.oid, decoded_token.azp or "", scope), capacity, now)
+
+            # Refill according to the time elapsed since the bucket was last touched
+            bucket.tokens = min(capacity, bucket.tokens + (now - bucket.updated) * rate)
+            bucket.updated = now
+
+            if bucket.tokens < 1:
+                retry_after = math.ceil((1 - bucket.tokens) / rate) if rate > 0 else 60
+                logger.warning(f"Rate limit exceeded for principal '{decoded_token.oid}' on scope '{scope}'")
+                raise HTTPException(
+                    status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                    detail="Rate limit exceeded",
+                    headers={"Retry-After": str(retry_after)},
+                )
+            buckets.append(bucket)
+
+        for bucket in buckets:
+            bucket.tokens -= 1
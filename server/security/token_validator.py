@@ -10,11 +10,11 @@ logger = logging.getLogger("token_validator")
 
 
 # Get the OpenID configuration with public keys
-async def get_openid_config():
-    logger.info("Fetching OpenID configuration.")
+async def get_openid_config(authority: str = AzureConfig.AUTHORITY):
+    logger.info(f"Fetching OpenID configuration of {authority}.")
     try:
         async with httpx.AsyncClient() as client:
-            response = await client.get(f"{AzureConfig.AUTHORITY}/v2.0/.well-known/openid-configuration")
+            response = await client.get(f"{authority}/v2.0/.well-known/openid-configuration")
             response.raise_for_status()
             logger.info("Successfully fetched OpenID configuration.")
             return response.json()
@@ -1,12 +1,15 @@
+from collections import deque
 from typing import List, Optional
+import itertools
 import uuid
 import asyncio
 from models import *
 from logger import *
+from .hero_statistics import HeroStatistics
 
 
 class HeroService:
-    def __init__(self):
+    def __init__(self, change_buffer_size: int = 1024):
 
         # In-memory structure to store heroes
         self.heroes_db: List[Hero] = []
@@ -14,10 +17,36 @@ class HeroService:
         # Lock to handle concurrent access
         self.lock = asyncio.Lock()
 
+        # Bounded ring buffer of the most recent changes, oldest ones are dropped first
+        self.changes = deque(maxlen=change_buffer_size)
+        self.sequence = 0
+
+        # Set and replaced on every change to wake up waiting consumers
+        self.changed = asyncio.Event()
+
+        # Number of consumers currently long-polling or streaming the change feed
+        self.subscribers = 0
+
+        # Running aggregates, updated on every create and delete
+        self.statistics = HeroStatistics()
+
+    def _publish(self, change_type: str, hero: Hero) -> None:
+        self.sequence += 1
+        self.changes.append(HeroChange(
+            sequence=self.sequence,
+            type=change_type,
+            hero_id=hero.id,
+            hero=hero if change_type == "created" else None
+        ))
+        self.changed.set()
+        self.changed = asyncio.Event()
+
     async def create_hero(self, hero: Hero) -> Hero:
         async with self.lock:
             hero.id = str(uuid.uuid4())
             self.heroes_db.append(hero)
+            self.statistics.add(hero)
+            self._publish("created", hero)
             logger.info(f"Hero '{hero.name}' created with ID: {hero.id}")
             return hero
 
@@ -40,12 +69,51 @@ class HeroService:
             hero = next((h for h in self.heroes_db if h.id == hero_id), None)
             if hero:
                 self.heroes_db.remove(hero)
+                self.statistics.remove(hero)
+                self._publish("deleted", hero)
                 logger.info(f"Hero '{hero_id}' deleted.")
                 return True
             else:
                 logger.warning(f"Hero '{hero_id}' not found for deletion.")
                 return False
 
+    def changes_since(self, sequence: int) -> HeroChanges:
+        """
+        Returns the changes after the given sequence number. If some of them have already been dropped from
+        the ring buffer the response is flagged with 'reset', and the consumer has to re-fetch the full list.
+        """
+        oldest = self.changes[0].sequence if self.changes else self.sequence + 1
+        if sequence < oldest - 1 or sequence > self.sequence:
+            return HeroChanges(sequence=self.sequence, reset=True)
+        start = len(self.changes) - (self.sequence - sequence)
+        return HeroChanges(sequence=self.sequence, changes=list(itertools.islice(self.changes, start, None)))
+
+    async def wait_for_changes(self, sequence: int, timeout: float) -> HeroChanges:
+        """Long-polls for changes after the given sequence number for at most `timeout` seconds."""
+        if sequence == self.sequence:
+            try:
+                await asyncio.wait_for(self.changed.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+        return self.changes_since(sequence)
+
+    async def get_statistics(self, group_by: List[str], verify: bool = False) -> HeroStats:
+        """
+        Returns the running aggregates, optionally grouped by race, class_ and/or level. If `verify` is set the
+        aggregates are rebuilt from the stored heroes first, and replaced by the rebuilt ones should they differ.
+        """
+        async with self.lock:
+            consistent = None
+            if verify:
+                rebuilt = HeroStatistics.from_heroes(self.heroes_db)
+                consistent = self.statistics.matches(rebuilt)
+                if not consistent:
+                    logger.error("Hero statistics diverged from the stored heroes, replacing them with rebuilt ones.")
+                    self.statistics = rebuilt
+            stats = self.statistics.snapshot(group_by)
+            stats.consistent = consistent
+            return stats
+
     async def query_heroes_fireball_low_ac(self) -> List[Hero]:
         async with self.lock:
             results = [
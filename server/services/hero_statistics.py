@@ -0,0 +1,92 @@
+from itertools import combinations
+from typing import Dict, Iterable, List, Tuple
+
+from models import *
+
+# Hero fields which statistics may be grouped by
+DIMENSIONS = ("race", "class_", "level")
+
+
+class HeroAggregate:
+    """Running count and sums of a group of heroes, from which the averages are derived."""
+    __slots__ = ("count", "hit_points", "armor_class")
+
+    def __init__(self):
+        self.count = 0
+        self.hit_points = 0
+        self.armor_class = 0
+
+    def update(self, hero: Hero, sign: int) -> None:
+        self.count += sign
+        self.hit_points += sign * hero.hit_points
+        self.armor_class += sign * hero.armor_class
+
+    def as_tuple(self) -> Tuple[int, int, int]:
+        return self.count, self.hit_points, self.armor_class
+
+
+class HeroStatistics:
+    """
+    Aggregates over all heroes, maintained for every combination of the grouping dimensions so that both
+    adding and removing a hero touch a constant number of aggregates.
+    """
+
+    def __init__(self):
+        self.total = HeroAggregate()
+        self.groups: Dict[Tuple[str, ...], Dict[tuple, HeroAggregate]] = {
+            dimensions: {}
+            for size in range(1, len(DIMENSIONS) + 1)
+            for dimensions in combinations(DIMENSIONS, size)
+        }
+
+    @classmethod
+    def from_heroes(cls, heroes: Iterable[Hero]) -> "HeroStatistics":
+        statistics = cls()
+        for hero in heroes:
+            statistics.add(hero)
+        return statistics
+
+    def _update(self, hero: Hero, sign: int) -> None:
+        self.total.update(hero, sign)
+        for dimensions, groups in self.groups.items():
+            key = tuple(getattr(hero, dimension) for dimension in dimensions)
+            aggregate = groups.get(key)
+            if aggregate is None:
+                aggregate = groups[key] = HeroAggregate()
+            aggregate.update(hero, sign)
+            if aggregate.count == 0:
+                del groups[key]
+
+    def add(self, hero: Hero) -> None:
+        self._update(hero, 1)
+
+    def remove(self, hero: Hero) -> None:
+        self._update(hero, -1)
+
+    def matches(self, other: "HeroStatistics") -> bool:
+        if self.total.as_tuple() != other.total.as_tuple():
+            return False
+        for dimensions, groups in self.groups.items():
+            other_groups = other.groups[dimensions]
+            if groups.keys() != other_groups.keys():
+                return False
+            if any(aggregate.as_tuple() != other_groups[key].as_tuple() for key, aggregate in groups.items()):
+                return False
+        return True
+
+    def snapshot(self, group_by: List[str]) -> HeroStats:
+        """Returns the overall statistics, broken down by the given dimensions if any."""
+        dimensions = tuple(dimension for dimension in DIMENSIONS if dimension in group_by)
+        groups = [
+            HeroStatsGroup(key=dict(zip(dimensions, key)), **summarize(aggregate))
+            for key, aggregate in sorted(self.groups[dimensions].items(), key=lambda item: item[0])
+        ] if dimensions else []
+        return HeroStats(**summarize(self.total), group_by=list(dimensions), groups=groups)
+
+
+def summarize(aggregate: HeroAggregate) -> dict:
+    return {
+        "count": aggregate.count,
+        "average_hit_points": aggregate.hit_points / aggregate.count if aggregate.count else None,
+        "average_armor_class": aggregate.armor_class / aggregate.count if aggregate.count else None,
+    }
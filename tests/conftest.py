@@ -0,0 +1,7 @@
+import os
+import sys
+
+# The client is imported as the 'client' package, whereas the server's modules import each other from the 'server' directory
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "server"))
@@ -0,0 +1,118 @@
+import asyncio
+from types import SimpleNamespace
+
+import httpx
+import pytest
+
+from client.services import backend_client as backend_client_module
+from client.services.backend_client import CircuitBreaker, ResilientBackendClient
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = SimpleNamespace(now=1000.0)
+    monkeypatch.setattr(backend_client_module, "time", SimpleNamespace(monotonic=lambda: clock.now))
+    return clock
+
+
+def test_opens_after_consecutive_failures(clock):
+    breaker = CircuitBreaker(failure_threshold=3, reset_timeout=30)
+    for _ in range(2):
+        breaker.record_failure()
+    assert breaker.state == "closed" and breaker.allow_request()
+
+    breaker.record_failure()
+    assert breaker.state == "open"
+    assert not breaker.allow_request()
+
+
+def test_success_resets_failure_count(clock):
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=30)
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    assert breaker.state == "closed"
+
+
+def test_half_open_lets_a_single_trial_through(clock):
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30)
+    breaker.record_failure()
+
+    clock.now += 30
+    assert breaker.allow_request()
+    assert breaker.state == "half-open"
+    assert not breaker.allow_request()
+
+
+def test_successful_trial_closes(clock):
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30)
+    breaker.record_failure()
+    clock.now += 30
+    assert breaker.allow_request()
+
+    breaker.record_success()
+    assert breaker.state == "closed"
+    assert breaker.allow_request() and breaker.allow_request()
+
+
+def test_failed_trial_reopens(clock):
+    breaker = CircuitBreaker(failure_threshold=5, reset_timeout=30)
+    for _ in range(5):
+        breaker.record_failure()
+    clock.now += 30
+    assert breaker.allow_request()
+
+    breaker.record_failure()
+    assert breaker.state == "open"
+    assert not breaker.allow_request()
+    assert breaker.retry_after() == 31
+
+
+def test_released_trial_lets_another_through(clock):
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30)
+    breaker.record_failure()
+    clock.now += 30
+    assert breaker.allow_request()
+
+    breaker.release_trial()
+    assert breaker.state == "half-open"
+    assert breaker.allow_request()
+
+
+def test_stuck_trial_is_given_up_on(clock):
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30)
+    breaker.record_failure()
+    clock.now += 30
+    assert breaker.allow_request()
+
+    clock.now += 29
+    assert not breaker.allow_request()
+    clock.now += 1
+    assert breaker.allow_request()
+
+
+def make_client(handler, monkeypatch) -> ResilientBackendClient:
+    monkeypatch.setenv("HVALFANGST_API_URL", "http://backend")
+    monkeypatch.setenv("HVALFANGST_API_BREAKER_THRESHOLD", "1")
+    monkeypatch.setenv("HVALFANGST_API_BACKOFF_BASE", "0")
+    client = ResilientBackendClient()
+    client._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    return client
+
+
+def test_shed_requests_do_not_open_the_breaker(monkeypatch):
+    responses = iter([httpx.Response(503, headers={"Retry-After": "0"}), httpx.Response(200, json=[])])
+    client = make_client(lambda request: next(responses), monkeypatch)
+
+    response = asyncio.run(client.request("GET", "/heroes/"))
+    assert response.status_code == 200
+    assert client.breaker.state == "closed"
+    assert client.counters["retries"] == 1
+
+
+def test_server_errors_open_the_breaker(monkeypatch):
+    client = make_client(lambda request: httpx.Response(500), monkeypatch)
+
+    response = asyncio.run(client.request("GET", "/heroes/"))
+    assert response.status_code == 500
+    assert client.breaker.state == "open"
@@ -0,0 +1,62 @@
+import asyncio
+
+from models import Hero
+from services.hero_service import HeroService
+
+
+def make_hero(name: str) -> Hero:
+    return Hero(id="", name=name, race="Elf", class_="Wizard", level=1, hit_points=10, armor_class=12, speed=30)
+
+
+def make_service(buffer_size: int, heroes: int) -> HeroService:
+    async def create():
+        service = HeroService(buffer_size)
+        for i in range(heroes):
+            await service.create_hero(make_hero(f"hero-{i}"))
+        return service
+    return asyncio.run(create())
+
+
+def sequences(changes) -> list:
+    return [change.sequence for change in changes.changes]
+
+
+def test_empty_feed():
+    service = make_service(buffer_size=4, heroes=0)
+    changes = service.changes_since(0)
+    assert not changes.reset and changes.changes == [] and changes.sequence == 0
+    assert service.changes_since(1).reset
+
+
+def test_changes_after_sequence():
+    service = make_service(buffer_size=4, heroes=3)
+    assert sequences(service.changes_since(0)) == [1, 2, 3]
+    assert sequences(service.changes_since(2)) == [3]
+    assert sequences(service.changes_since(3)) == []
+
+
+def test_reset_once_changes_have_been_dropped():
+    service = make_service(buffer_size=4, heroes=6)
+
+    # Changes 3 to 6 are buffered, so consumers at 2 have missed nothing whereas those at 1 have missed 2
+    assert sequences(service.changes_since(2)) == [3, 4, 5, 6]
+    assert not service.changes_since(2).reset
+    assert service.changes_since(1).reset
+    assert service.changes_since(0).reset
+
+
+def test_reset_for_sequences_from_the_future():
+    service = make_service(buffer_size=4, heroes=2)
+    changes = service.changes_since(3)
+    assert changes.reset and changes.sequence == 2
+
+
+def test_deletions_are_published():
+    async def run():
+        service = HeroService(4)
+        hero = await service.create_hero(make_hero("hero"))
+        await service.delete_hero(hero.id)
+        return service
+
+    changes = asyncio.run(run()).changes_since(1)
+    assert [(change.type, change.hero) for change in changes.changes] == [("deleted", None)]
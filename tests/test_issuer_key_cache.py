@@ -0,0 +1,126 @@
+import asyncio
+import json
+from types import SimpleNamespace
+
+import pytest
+from cryptography.hazmat.primitives.asymmetric import rsa
+from fastapi import HTTPException
+from jwt.algorithms import RSAAlgorithm
+
+from security import jwk_utils
+from security.jwk_utils import IssuerKeyCache
+
+
+def make_jwk(kid: str) -> dict:
+    private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    jwk = json.loads(RSAAlgorithm.to_jwk(private_key.public_key()))
+    jwk["kid"] = kid
+    return jwk
+
+
+JWKS = {kid: make_jwk(kid) for kid in ("a", "b", "c")}
+
+
+class FakeIssuer:
+    """Stands in for the issuer's JWKS endpoint, counting fetches and failing on demand."""
+
+    def __init__(self, kids):
+        self.kids = list(kids)
+        self.fetches = 0
+        self.failing = False
+
+    async def __call__(self, authority: str):
+        self.fetches += 1
+        if self.failing:
+            raise RuntimeError("issuer unavailable")
+        return [JWKS[kid] for kid in self.kids]
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = SimpleNamespace(now=1000.0)
+    monkeypatch.setattr(jwk_utils, "time", SimpleNamespace(monotonic=lambda: clock.now))
+    return clock
+
+
+@pytest.fixture
+def issuer(monkeypatch):
+    issuer = FakeIssuer(["a", "b"])
+    monkeypatch.setattr(jwk_utils, "get_public_jwks", issuer)
+    return issuer
+
+
+def make_cache(max_keys: int = 16) -> IssuerKeyCache:
+    return IssuerKeyCache("tenant", max_keys=max_keys, ttl=3600, min_refresh_interval=300)
+
+
+def get_key(cache: IssuerKeyCache, kid: str):
+    return asyncio.run(cache.get_key(kid))
+
+
+def test_keys_are_fetched_once_and_cached(clock, issuer):
+    cache = make_cache()
+    assert get_key(cache, "a") is get_key(cache, "a")
+    get_key(cache, "b")
+    assert issuer.fetches == 1
+
+
+def test_unknown_kid_refreshes_at_most_once_per_interval(clock, issuer):
+    cache = make_cache()
+    get_key(cache, "a")
+
+    for _ in range(3):
+        with pytest.raises(HTTPException) as error:
+            get_key(cache, "unknown")
+        assert error.value.status_code == 401
+    assert issuer.fetches == 1
+
+    clock.now += 300
+    issuer.kids.append("c")
+    get_key(cache, "c")
+    assert issuer.fetches == 2
+
+
+def test_expired_keys_are_refreshed(clock, issuer):
+    cache = make_cache()
+    get_key(cache, "a")
+
+    clock.now += 3600
+    issuer.kids = ["b"]
+    get_key(cache, "b")
+    assert issuer.fetches == 2
+    assert list(cache.keys) == ["b"]
+
+
+def test_cached_keys_are_served_while_refreshing_fails(clock, issuer):
+    cache = make_cache()
+    key = get_key(cache, "a")
+
+    clock.now += 3600
+    issuer.failing = True
+    assert get_key(cache, "a") is key
+    assert get_key(cache, "a") is key
+    assert issuer.fetches == 2
+
+
+def test_failed_fetch_without_cached_keys_is_retried_immediately(clock, issuer):
+    cache = make_cache()
+    issuer.failing = True
+    with pytest.raises(RuntimeError):
+        get_key(cache, "a")
+
+    issuer.failing = False
+    assert get_key(cache, "a") is not None
+    assert issuer.fetches == 2
+
+
+def test_least_recently_used_keys_are_evicted(clock, issuer):
+    cache = make_cache(max_keys=2)
+    get_key(cache, "a")
+    get_key(cache, "b")
+    get_key(cache, "a")
+
+    clock.now += 300
+    issuer.kids.append("c")
+    get_key(cache, "c")
+    assert list(cache.keys) == ["a", "c"]